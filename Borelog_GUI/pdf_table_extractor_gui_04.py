@@ -17,9 +17,9 @@ Features:
    - A new column is automatically added.
 
 2. **Column Management**
-   - Edit existing column names and boundaries.
-   - Delete columns using red ❌ buttons.
-   - Add new empty columns if needed.
+   - Edit existing column names and boundaries in a single table.
+   - Delete columns by removing their rows.
+   - Add new columns as new rows (blank cells get a default name and range).
 
 3. **Header & Footer Cutoffs**
    - Define the y-ranges to ignore headers and footers.
@@ -29,7 +29,7 @@ Features:
 
 5. **Data Extraction**
    - Extract table data from the *current page* or *all pages*.
-   - Export results as an Excel file.
+   - Export results as an Excel file (or a streamed CSV for all pages).
 
 6. **PDF Preview**
    - Displays the PDF page with visual boundaries for columns, header, and footer.
@@ -38,13 +38,21 @@ Author: Ali Yaz
 Date: 2025-10-06
 """
 
+from collections import OrderedDict
+import hashlib
+import os
+import tempfile
+import threading
 import streamlit as st
 import pdfplumber
+import numpy as np
 import pandas as pd
-from collections import defaultdict
-from PIL import Image, ImageDraw, ImageFont
+import xlsxwriter
+from PIL import Image, ImageColor, ImageDraw, ImageFont
 from io import BytesIO
 
+from table_extraction import extract_positional_table, parse_pages, words_from_chars
+
 # optional: click-to-coords component (if you use it)
 try:
     from streamlit_image_coordinates import streamlit_image_coordinates
@@ -52,124 +60,287 @@ try:
 except Exception:
     _has_click_comp = False
 
-st.set_page_config(page_title="PDF Table Extractor", layout="wide")
-st.title("📊 PDF Table Extractor (Interactive Column Boundaries)")
-
 # ---------- FUNCTIONS ----------
-def assign_row(y, existing_rows, tolerance=2):
-    """Group visually-close y positions into the same row."""
-    for ry in existing_rows:
-        if abs(y - ry) <= tolerance:
-            return ry
-    return y
-
-def extract_positional_table(page, columns, y_tolerance=2, header_cutoff=200, footer_cutoff=570):
-    """Extract rows from a single page using defined x-ranges for columns."""
-    words = page.extract_words()
-    rows = defaultdict(lambda: defaultdict(str))
-    for w in words:
-        x, y, text = w["x0"], w["top"], w["text"]
-        if y < header_cutoff or y > footer_cutoff:
+# Column guide colors, cycled in column order
+_COLORS = ("blue", "green", "orange", "purple", "brown", "pink", "cyan", "magenta")
+
+@st.cache_resource(show_spinner=False)
+def _font(scale):
+    """Load the overlay font once per preview scale (kept across reruns, unlike a module-level cache)."""
+    try:
+        return ImageFont.truetype("arial.ttf", 12 * scale)
+    except Exception:
+        return ImageFont.load_default()
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _open_pdf(file_hash, _pdf_bytes):
+    """
+    Open each uploaded PDF once (xref, trailer, page tree) and keep it across reruns.
+    Returns (pdf, lock): the document is shared by every session's script thread, so
+    hold the lock while touching its pages. Evicted documents are BytesIO-backed and
+    need no explicit close.
+    """
+    return pdfplumber.open(BytesIO(_pdf_bytes)), threading.Lock()
+
+# Parsed pages kept for reuse across reruns (~60 KB each on a dense log page)
+WORD_CACHE_PAGES = 500
+
+@st.cache_resource(show_spinner=False)
+def _word_store():
+    """
+    LRU of word arrays keyed by (file hash, page index), shared by all sessions, with its lock.
+    Words don't depend on the column settings, so edits only redo the bucketing; the store
+    holds at most ``WORD_CACHE_PAGES`` pages whatever the size of the PDFs.
+    """
+    return OrderedDict(), threading.Lock()
+
+def _cached_words(file_hash, page_index):
+    """Word arrays from ``_word_store`` (marked as recently used), or None if not kept."""
+    store, lock = _word_store()
+    with lock:
+        words = store.get((file_hash, page_index))
+        if words is not None:
+            store.move_to_end((file_hash, page_index))
+        return words
+
+def _keep_words(file_hash, page_index, words, evict=True):
+    """
+    Add a page's word arrays to ``_word_store``, evicting the least recently used pages.
+    With ``evict=False`` the page is only kept while the store has room.
+    """
+    store, lock = _word_store()
+    with lock:
+        if not evict and len(store) >= WORD_CACHE_PAGES:
+            return
+        store[(file_hash, page_index)] = words
+        while len(store) > WORD_CACHE_PAGES:
+            store.popitem(last=False)
+
+def _words_soa(file_hash, page_index, pdf_bytes):
+    """Word tokens of one page as (x0, top, x1, bottom, text) arrays, parsed on first use."""
+    words = _cached_words(file_hash, page_index)
+    if words is None:
+        pdf, lock = _open_pdf(file_hash, pdf_bytes)
+        with lock:
+            page = pdf.pages[page_index]
+            words = words_from_chars(page.chars)
+            # The arrays are kept below; don't also keep the page's layout alive in the shared document
+            page.flush_cache()
+        _keep_words(file_hash, page_index, words)
+    return words
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _render_page(file_hash, page_index, scale, _pdf_bytes):
+    """Cached high-res rasterization of a page; independent of column edits."""
+    pdf, lock = _open_pdf(file_hash, _pdf_bytes)
+    with lock:
+        return pdf.pages[page_index].to_image(resolution=72 * scale).original
+
+def _draw_word_boxes(img, words, scale):
+    """Outline every word in red, in place (PIL rectangles beat any per-word array writes)."""
+    draw = ImageDraw.Draw(img)
+    x0s, tops, x1s, bottoms, _ = words
+    for box in zip((x0s * scale).tolist(), (tops * scale).tolist(), (x1s * scale).tolist(), (bottoms * scale).tolist()):
+        draw.rectangle(box, outline="red", width=1 * scale)
+
+def _burn_lines(arr, lines):
+    """
+    Write axis-aligned guide lines into the RGB buffer in place.
+    ``lines`` holds ("v" | "h", position_px, color, width_px) tuples; lines
+    that fall entirely off the page are skipped, partly visible ones clipped.
+    """
+    h, w = arr.shape[:2]
+    for orient, pos, color, width in lines:
+        start = int(round(pos - width / 2))
+        end = start + width
+        if end <= 0 or start >= (w if orient == "v" else h):
             continue
-        for col, (xmin, xmax) in columns.items():
-            if xmin <= x <= xmax:
-                row_y = assign_row(y, rows.keys(), tolerance=y_tolerance)
-                rows[row_y][col] += (" " + text)
-                break
-    data = [rows[y] for y in sorted(rows.keys())]
-    return pd.DataFrame(data)
-
-def draw_page_image_with_columns(page, columns, header_cutoff=None, footer_cutoff=None, scale=2):
+        value = ImageColor.getrgb(color)
+        if orient == "v":
+            arr[:, max(start, 0):end] = value
+        else:
+            arr[max(start, 0):end, :] = value
+
+def _burn_tile(arr, tile, x, y):
+    """Copy an RGB tile into the buffer at (x, y), clipped to the page edges."""
+    h, w = arr.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + tile.shape[1], w), min(y + tile.shape[0], h)
+    if x0 < x1 and y0 < y1:
+        arr[y0:y1, x0:x1] = tile[y0 - y:y1 - y, x0 - x:x1 - x]
+
+@st.cache_data(show_spinner=False)
+def _label_tile(col_name, color, scale):
+    """Render a column label once as an RGB array: rotated 90°, cropped tight, on solid white."""
+    # Size the canvas from the text itself so long names survive larger preview scales
+    font = _font(scale)
+    _, _, right, bottom = font.getbbox(col_name)
+    text_img = Image.new("RGBA", (max(right, 1) + 10, max(bottom, 1) + 10), (255, 255, 255, 0))
+    ImageDraw.Draw(text_img).text((5, 5), col_name, fill=color, font=font)
+
+    # Rotate, then crop away the extra transparent space
+    rotated = text_img.rotate(90, expand=1)
+    rotated_cropped = rotated.crop(rotated.getbbox())
+
+    # Flatten onto a tight white background so a single copy draws both
+    tile = Image.new("RGB", rotated_cropped.size, (255, 255, 255))
+    tile.paste(rotated_cropped, mask=rotated_cropped)
+    return np.asarray(tile)
+
+def draw_page_image_with_columns(page_img, words, columns, header_cutoff=None, footer_cutoff=None, scale=2,
+                                 show_word_boxes=False):
     """
-    Draws the PDF page with visual guides:
-    - Red boxes around words
+    Draws guides on a copy of the rendered page image (see ``_render_page``):
+    - Red boxes around words (only if ``show_word_boxes``)
     - Vertical lines for each column's xmin/xmax
     - Optional header/footer cutoff lines
     - Column labels with improved visibility
     """
-    # Convert PDF page to a high-res image
-    im_obj = page.to_image(resolution=72 * scale)
-    pil_img = im_obj.original.copy()
+    if page_img.mode != "RGB":
+        page_img = page_img.convert("RGB")
+
+    # Draw word bounding boxes (for debugging), on a copy so the cached rasterization stays clean
+    if show_word_boxes and len(words[0]):
+        page_img = page_img.copy()
+        _draw_word_boxes(page_img, words, scale)
+
+    # One RGB buffer (the rasterization's own mode) for the guides, converted back to PIL
+    # once; this is also the copy that keeps the cached rasterization clean
+    arr = np.array(page_img)
+
+    # Draw column boundaries and header/footer cutoffs
+    col_colors = [_COLORS[i % len(_COLORS)] for i in range(len(columns))]
+    lines = []
+    for color, (xmin, xmax) in zip(col_colors, columns.values()):
+        lines.append(("v", xmin * scale, color, 2 * scale))
+        lines.append(("v", xmax * scale, color, 2 * scale))
+    for cutoff in (header_cutoff, footer_cutoff):
+        if cutoff is not None:
+            lines.append(("h", cutoff * scale, "black", 2 * scale))
+    _burn_lines(arr, lines)
+
+    # Draw vertical (rotated) labels with white background (cached per name/color/size)
+    for color, (col_name, (xmin, xmax)) in zip(col_colors, columns.items()):
+        tile = _label_tile(col_name, color, scale)
+        text_x = int((xmin + xmax) * scale / 2 - tile.shape[1] / 2)
+        text_y = int(7.5 * scale)  # top margin (7.5pt)
+        _burn_tile(arr, tile, text_x, text_y)
+
+    pil_img = Image.fromarray(arr)
+
+    # Label header / footer cutoffs (offsets in PDF points, like the lines)
     draw = ImageDraw.Draw(pil_img)
-
-    # Load font safely
-    try:
-        font = ImageFont.truetype("arial.ttf", 12 * scale)
-    except:
-        font = ImageFont.load_default()
-
-    # Draw word bounding boxes (for debugging)
-    for w in page.extract_words():
-        x0, top, x1, bottom = (
-            w["x0"] * scale,
-            w["top"] * scale,
-            w["x1"] * scale,
-            w["bottom"] * scale,
-        )
-        draw.rectangle([x0, top, x1, bottom], outline="red", width=1 * scale)
-
-    # Draw column boundaries and vertical text labels
-    colors = ["blue", "green", "orange", "purple", "brown", "pink", "cyan", "magenta"]
-    for i, (col_name, (xmin, xmax)) in enumerate(columns.items()):
-        color = colors[i % len(colors)]
-        xmin_s, xmax_s = xmin * scale, xmax * scale
-
-        # Draw vertical boundary lines
-        draw.line([(xmin_s, 0), (xmin_s, pil_img.height)], fill=color, width=2 * scale)
-        draw.line([(xmax_s, 0), (xmax_s, pil_img.height)], fill=color, width=2 * scale)
-
-        # Draw vertical (rotated) label with white background
-        text_img = Image.new("RGBA", (200, 50), (255, 255, 255, 0))
-        text_draw = ImageDraw.Draw(text_img)
-        text_draw.text((5, 5), col_name, fill=color, font=font)
-
-        # Rotate text
-        rotated = text_img.rotate(90, expand=1)
-
-        # Crop the rotated image to remove extra transparent space
-        bbox = rotated.getbbox()
-        rotated_cropped = rotated.crop(bbox)
-
-        # Create tight white background
-        bg = Image.new("RGBA", rotated_cropped.size, (255, 255, 255, 255))  # solid white
-
-        # Compute placement
-        text_x = int((xmin_s + xmax_s) / 2 - rotated_cropped.width / 2)
-        text_y = 15  # top margin
-
-        # Paste background then the rotated text
-        pil_img.paste(bg, (text_x, text_y), bg)
-        pil_img.paste(rotated_cropped, (text_x, text_y), rotated_cropped)
-
-
-    # Draw header cutoff
+    font = _font(scale)
     if header_cutoff is not None:
-        y = header_cutoff * scale
-        draw.line([(0, y), (pil_img.width, y)], fill="black", width=2 * scale)
-        draw.text((5, y - 50), "Header cutoff", fill="black", font=font)
-
-    # Draw footer cutoff
+        draw.text((2.5 * scale, (header_cutoff - 25) * scale), "Header cutoff", fill="black", font=font)
     if footer_cutoff is not None:
-        y = footer_cutoff * scale
-        draw.line([(0, y), (pil_img.width, y)], fill="black", width=2 * scale)
-        draw.text((5, y - 15), "Footer cutoff", fill="black", font=font)
+        draw.text((2.5 * scale, (footer_cutoff - 7.5) * scale), "Footer cutoff", fill="black", font=font)
 
     return pil_img
 
-# ---------- UPLOAD ----------
-uploaded_file = st.file_uploader("📂 Upload PDF file", type=["pdf"])
-if not uploaded_file:
-    st.info("Upload a PDF to start. (Click coordinates feature requires 'streamlit-image-coordinates' package.)")
-    st.stop()
+def _to_jpeg_bytes(pil_img, quality=85):
+    """Encode the preview as JPEG; much cheaper than st.image's default PNG deflate for a full page."""
+    buf = BytesIO()
+    pil_img.save(buf, "JPEG", quality=quality, optimize=False)
+    return buf.getvalue()
 
-with pdfplumber.open(uploaded_file) as pdf:
-    num_pages = len(pdf.pages)
+def _to_xlsx_bytes(frames, header):
+    """
+    Stream DataFrames to a temporary .xlsx with xlsxwriter in constant_memory mode (each
+    row is flushed to disk as soon as the next one starts, and only one page's table is
+    held) and return (bytes, first 50 rows for the on-screen preview).
+    """
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    head, n_head = [], 0
+    try:
+        workbook = xlsxwriter.Workbook(
+            path, {"constant_memory": True, "strings_to_formulas": False, "strings_to_urls": False}
+        )
+        sheet = workbook.add_worksheet()
+        sheet.write_row(0, 0, [str(c) for c in header])
+        r = 1
+        for df in frames:
+            df = df.reindex(columns=header)
+            # Row by row: pandas' own writer goes column by column, which constant_memory can't take
+            for row in df.itertuples(index=False, name=None):
+                # NaN -> blank cell, converted per row so no full-frame copy is made
+                sheet.write_row(r, 0, [None if pd.isna(v) else v for v in row])
+                r += 1
+            if n_head < 50:
+                head.append(df.head(50 - n_head))
+                n_head += len(head[-1])
+        workbook.close()
+        with open(path, "rb") as f:
+            data = f.read()
+    finally:
+        os.remove(path)
+    df_head = pd.concat(head, ignore_index=True) if head else pd.DataFrame(columns=header)
+    return data, df_head
+
+def _to_csv_bytes(frames, header):
+    """
+    Stream DataFrames to a temporary CSV one at a time (no concat, so only one page's
+    table is held) and return (bytes, first 50 rows for the on-screen preview).
+    """
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    head, n_head = [], 0
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            # Header through pandas too, so every line ends the same way
+            pd.DataFrame(columns=header).to_csv(f, index=False)
+            for df in frames:
+                df = df.reindex(columns=header)
+                df.to_csv(f, header=False, index=False)
+                if n_head < 50:
+                    head.append(df.head(50 - n_head))
+                    n_head += len(head[-1])
+        with open(path, "rb") as f:
+            data = f.read()
+    finally:
+        os.remove(path)
+    df_head = pd.concat(head, ignore_index=True) if head else pd.DataFrame(columns=header)
+    return data, df_head
+
+def _reset_column_editor():
+    """Re-seed the column table editor from st.session_state.columns (after changes made outside it)."""
+    st.session_state.column_table = pd.DataFrame(
+        [{"Name": n, "Xmin": float(lo), "Xmax": float(hi)} for n, (lo, hi) in st.session_state.columns.items()],
+        columns=["Name", "Xmin", "Xmax"],
+    )
+    st.session_state.pop("col_editor", None)
+
+def main():
+    """
+    The app itself. Spawned "Extract All Pages" workers re-run this script as
+    ``__mp_main__`` to recreate the parent's main module, so the UI only runs
+    under Streamlit.
+    """
+    st.set_page_config(page_title="PDF Table Extractor", layout="wide")
+    st.title("📊 PDF Table Extractor (Interactive Column Boundaries)")
+
+    # ---------- UPLOAD ----------
+    uploaded_file = st.file_uploader("📂 Upload PDF file", type=["pdf"])
+    if not uploaded_file:
+        st.info("Upload a PDF to start. (Click coordinates feature requires 'streamlit-image-coordinates' package.)")
+        st.stop()
+
+    # Hash the upload once; the digest keys every per-page cache below
+    pdf_bytes = uploaded_file.getvalue()
+    if st.session_state.get("file_id") != uploaded_file.file_id:
+        st.session_state.file_id = uploaded_file.file_id
+        st.session_state.file_hash = hashlib.md5(pdf_bytes).hexdigest()
+    file_hash = st.session_state.file_hash
+
+    pdf, pdf_lock = _open_pdf(file_hash, pdf_bytes)
+    with pdf_lock:
+        num_pages = len(pdf.pages)
     st.success(f"✅ PDF loaded successfully ({num_pages} pages)")
 
     # ---------- LAYOUT ----------
     left_panel, right_panel = st.columns([1, 2])
 
-    # ---------- LEFT PANEL (robust add/rename/delete) ----------
+    # ---------- LEFT PANEL (add/rename/delete via one table) ----------
     with left_panel:
         st.subheader("🧭 Column & Boundary Settings")
 
@@ -187,63 +358,42 @@ with pdfplumber.open(uploaded_file) as pdf:
                 "Moisture_%": (440, 460),
             }
 
-        # Add new column safely (form prevents accidental triggers)
-        with st.form("add_column_form", clear_on_submit=True):
-            add_col = st.form_submit_button("➕ Add Column")
-            if add_col:
-                counter = 1
-                while f"NewColumn{counter}" in st.session_state.columns:
-                    counter += 1
-                new_name = f"NewColumn{counter}"
-                st.session_state.columns[new_name] = (10, 50)
-                st.rerun()
-
-
-        st.markdown("**Edit or delete columns**")
+        if "column_table" not in st.session_state:
+            _reset_column_editor()
+
+        st.markdown("**Edit, add or delete columns**")
+
+        # One table widget for all columns instead of 4 widgets per column. It is seeded from
+        # column_table, which only changes when columns are added outside the editor.
+        edited = st.data_editor(
+            st.session_state.column_table,
+            num_rows="dynamic",
+            hide_index=True,
+            width="stretch",
+            key="col_editor",
+            column_config={
+                "Name": st.column_config.TextColumn("Name"),
+                "Xmin": st.column_config.NumberColumn("Xmin", format="%.1f"),
+                "Xmax": st.column_config.NumberColumn("Xmax", format="%.1f"),
+            },
+        )
 
-        # We'll build a fresh mapping from the visible widgets each run.
-        # Use index-based widget keys to avoid name-collision issues on rename/delete.
-        items = list(st.session_state.columns.items())
+        # Rebuild the mapping from the table each run so renames/deletes take effect cleanly
+        taken = {str(n).strip() for n in edited["Name"] if pd.notna(n)}
         updated_columns = {}
-        deleted_any = False
-
-        for idx, (col_name, (xmin, xmax)) in enumerate(items):
-            # small left column for delete button, then inputs
-            c_del, c_name, c_xmin, c_xmax = st.columns([0.35, 2, 1.4, 1.4])
-
-            # delete button keyed by index (stable during this run)
-            if c_del.button("❌", key=f"del_{idx}"):
-                # mark deleted and force a rerun to clear orphan widgets
-                st.session_state._deleted = col_name
-                deleted_any = True
-                break  # break out so we rerun immediately
-
-            # editable name/xmin/xmax with index-based keys
-            new_name = c_name.text_input("Name", value=col_name, key=f"name_{idx}")
-            new_xmin = c_xmin.number_input("Xmin", value=float(xmin), key=f"xmin_{idx}")
-            new_xmax = c_xmax.number_input("Xmax", value=float(xmax), key=f"xmax_{idx}")
-
-            # guard rails
-            if not str(new_name).strip():
-                new_name = col_name
-            try:
-                new_xmin = float(new_xmin)
-                new_xmax = float(new_xmax)
-            except Exception:
-                new_xmin, new_xmax = xmin, xmax
-            if new_xmin > new_xmax:
-                new_xmin, new_xmax = new_xmax, new_xmin
-
-            updated_columns[new_name] = (new_xmin, new_xmax)
-
-        # If delete was clicked, actually remove the column and rerun immediately to avoid ghost widgets
-        if deleted_any and "_deleted" in st.session_state:
-            name_to_remove = st.session_state.pop("_deleted")
-            st.session_state.columns.pop(name_to_remove, None)
-            # trigger a fresh rerun so Streamlit rebuilds widgets afresh (no ghost buttons)
-            st.rerun()
-
-        # If no deletion triggered, save the updated mapping
+        for col_name, xmin, xmax in edited.itertuples(index=False, name=None):
+            # guard rails: new rows get a default name and range, inverted bounds are swapped
+            col_name = str(col_name).strip() if pd.notna(col_name) else ""
+            if not col_name:
+                counter = 1
+                while f"NewColumn{counter}" in taken:
+                    counter += 1
+                col_name = f"NewColumn{counter}"
+                taken.add(col_name)
+            if pd.isna(xmin) or pd.isna(xmax):
+                xmin, xmax = 10, 50
+            new_xmin, new_xmax = sorted((float(xmin), float(xmax)))
+            updated_columns[col_name] = (new_xmin, new_xmax)
         st.session_state.columns = updated_columns
 
         # --- Header/Footer cutoffs ---
@@ -251,6 +401,12 @@ with pdfplumber.open(uploaded_file) as pdf:
         header_cutoff = st.number_input("Header cutoff (y)", value=160)
         footer_cutoff = st.number_input("Footer cutoff (y)", value=570)
 
+        # --- Preview options ---
+        st.subheader("🖼️ Preview Options")
+        show_word_boxes = st.checkbox("Show word boxes", value=False)
+        # 1 = 72 DPI is enough to place boundaries; each step up costs ~scale² in render time
+        preview_scale = st.slider("Preview scale (× 72 DPI)", min_value=1, max_value=3, value=1)
+
         # --- Page navigation (symmetric) ---
         st.subheader("📄 Page Selection")
         if "current_page" not in st.session_state:
@@ -283,30 +439,50 @@ with pdfplumber.open(uploaded_file) as pdf:
     # ---------- RIGHT PANEL (preview + click-to-add) ----------
     with right_panel:
         st.subheader("🖼️ PDF Preview & Click-to-define Columns")
-        page = pdf.pages[page_number - 1]
-
-        # render preview image with overlays
-        page_img = draw_page_image_with_columns(
-            page,
-            st.session_state.columns,
-            header_cutoff=header_cutoff,
-            footer_cutoff=footer_cutoff,
-            scale=2
-        )
+        # render preview image with overlays, unless nothing visual changed since the last run
+        # (column order is part of the key: it picks each column's color)
+        preview_key = hash((
+            file_hash,
+            page_number,
+            tuple(st.session_state.columns.items()),
+            header_cutoff,
+            footer_cutoff,
+            preview_scale,
+            show_word_boxes,
+        ))
+        last_preview = st.session_state.get("last_preview")
+        if last_preview and last_preview[0] == preview_key:
+            _, page_img, preview_jpeg = last_preview
+        else:
+            page_img = draw_page_image_with_columns(
+                _render_page(file_hash, page_number - 1, preview_scale, pdf_bytes),
+                _words_soa(file_hash, page_number - 1, pdf_bytes),
+                st.session_state.columns,
+                header_cutoff=header_cutoff,
+                footer_cutoff=footer_cutoff,
+                scale=preview_scale,
+                show_word_boxes=show_word_boxes
+            )
+            preview_jpeg = _to_jpeg_bytes(page_img)
+            st.session_state.last_preview = (preview_key, page_img, preview_jpeg)
 
         # optional: click-to-define column boundaries if component is available
         if _has_click_comp:
-            coords = streamlit_image_coordinates(page_img, key=f"coords_{page_number}")
+            # JPEG like the st.image preview: the component's default PNG deflates the page every rerun
+            coords = streamlit_image_coordinates(
+                page_img, key=f"coords_{page_number}", image_format="JPEG", jpeg_quality=85
+            )
             if coords:
                 x, y = coords["x"], coords["y"]
                 st.write(f"Clicked at x={x:.1f}, y={y:.1f}")
+                # convert pixels back to PDF coords (image was rendered at preview_scale); the first
+                # click is stored in PDF coords so moving the scale slider between clicks is harmless
+                x_pdf = x / preview_scale
                 if "pending_x" not in st.session_state:
-                    st.session_state.pending_x = x
+                    st.session_state.pending_x = x_pdf
                     st.info(f"First boundary set at x={x:.1f} (click a second time for xmax)")
                 else:
-                    xmin_px, xmax_px = sorted([st.session_state.pending_x, x])
-                    # convert pixels back to PDF coords (we used scale=2)
-                    xmin_pdf, xmax_pdf = xmin_px / 2.0, xmax_px / 2.0
+                    xmin_pdf, xmax_pdf = sorted([st.session_state.pending_x, x_pdf])
                     # add new column and refresh UI
                     base = "NewColumn"
                     i = 1
@@ -315,13 +491,14 @@ with pdfplumber.open(uploaded_file) as pdf:
                         i += 1
                     new_col_name = f"{base}{i}"
                     st.session_state.columns[new_col_name] = (xmin_pdf, xmax_pdf)
+                    _reset_column_editor()
                     del st.session_state.pending_x
                     st.success(f"Added column '{new_col_name}' → ({xmin_pdf:.1f}, {xmax_pdf:.1f})")
                     st.rerun()
         else:
             st.info("Click-to-define columns requires 'streamlit-image-coordinates' package. (Optional)")
 
-        st.image(page_img, use_column_width=True)
+        st.image(preview_jpeg, width="stretch")
 
     # ---------- EXTRACTION ----------
     st.divider()
@@ -331,7 +508,7 @@ with pdfplumber.open(uploaded_file) as pdf:
     with c1:
         if st.button("📄 Extract Current Page"):
             df_page = extract_positional_table(
-                pdf.pages[page_number - 1],
+                _words_soa(file_hash, page_number - 1, pdf_bytes),
                 columns=st.session_state.columns,
                 header_cutoff=header_cutoff,
                 footer_cutoff=footer_cutoff
@@ -339,33 +516,66 @@ with pdfplumber.open(uploaded_file) as pdf:
             if not df_page.empty:
                 st.success(f"Data extracted from page {page_number}")
                 st.dataframe(df_page.head(50))
-                towrite = BytesIO()
-                df_page.to_excel(towrite, index=False, engine="openpyxl")
-                towrite.seek(0)
-                st.download_button("⬇ Download current page", data=towrite, file_name=f"page_{page_number}.xlsx")
+                data, _ = _to_xlsx_bytes([df_page], list(df_page.columns))
+                st.download_button("⬇ Download current page", data=data, file_name=f"page_{page_number}.xlsx")
             else:
                 st.warning("No data extracted from this page. Check boundaries/cutoffs.")
 
     with c2:
+        output_format = st.radio(
+            "Output format",
+            ["xlsx", "csv"],
+            horizontal=True,
+            help=(
+                "Both are written page by page, so only one page's table is held in memory. "
+                "CSV is plain text: quicker to write and without Excel's 1,048,576-row limit."
+            )
+        )
         if st.button("📘 Extract All Pages"):
-            all_pages = []
-            for i, pg in enumerate(pdf.pages, start=1):
-                df_page = extract_positional_table(
-                    pg,
-                    columns=st.session_state.columns,
-                    header_cutoff=header_cutoff,
-                    footer_cutoff=footer_cutoff
-                )
-                if not df_page.empty:
-                    df_page["Page"] = i
-                    all_pages.append(df_page)
-            if all_pages:
-                df_all = pd.concat(all_pages, ignore_index=True)
+            progress = st.progress(0.0, text="Extracting pages...")
+
+            # Parsing is the slow part and doesn't depend on the settings: only pages not yet
+            # in the word store (up to WORD_CACHE_PAGES, so column edits don't re-parse) are
+            # parsed, then each page's table is rebuilt and streamed out
+            def extracted_pages():
+                # Hold on to the cached pages now, so storing the parsed ones can't evict them mid-run
+                cached = {i: _cached_words(file_hash, i) for i in range(num_pages)}
+                missing = [i for i, words in cached.items() if words is None]
+                # pages are independent pdfminer parses, so fan them out across processes
+                parsed = parse_pages(pdf_bytes, missing)
+                try:
+                    for i in range(num_pages):
+                        words = cached.pop(i)
+                        if words is None:
+                            _, words = next(parsed)
+                            # Fill free slots only: evicting would just trade which pages the next run re-parses
+                            _keep_words(file_hash, i, words, evict=False)
+                        df_page = extract_positional_table(
+                            words,
+                            columns=st.session_state.columns,
+                            header_cutoff=header_cutoff,
+                            footer_cutoff=footer_cutoff
+                        )
+                        progress.progress((i + 1) / num_pages, text=f"Extracted page {i + 1}/{num_pages}")
+                        if not df_page.empty:
+                            df_page["Page"] = i + 1
+                            yield df_page
+                finally:
+                    parsed.close()
+
+            # Same header for both formats: the column table's order, then the page number
+            header = list(st.session_state.columns) + ["Page"]
+            # Both writers stream page by page, so only one page's table is held at a time
+            write = _to_csv_bytes if output_format == "csv" else _to_xlsx_bytes
+            data, df_head = write(extracted_pages(), header)
+            progress.empty()
+
+            if not df_head.empty:
                 st.success("Extraction completed for all pages!")
-                st.dataframe(df_all.head(50))
-                towrite = BytesIO()
-                df_all.to_excel(towrite, index=False, engine="openpyxl")
-                towrite.seek(0)
-                st.download_button("⬇ Download all pages", data=towrite, file_name="extracted_all.xlsx")
+                st.dataframe(df_head)
+                st.download_button("⬇ Download all pages", data=data, file_name=f"extracted_all.{output_format}")
             else:
                 st.warning("No data extracted. Check column boundaries/cutoffs.")
+
+if __name__ != "__mp_main__":
+    main()
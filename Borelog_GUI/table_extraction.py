@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Table Extraction Helpers
+------------------------
+
+Streamlit-free functions that turn a page's words into a positional table.
+They live outside the GUI script so "Extract All Pages" can run them in
+worker processes (functions defined in a Streamlit script cannot be pickled
+by ``ProcessPoolExecutor``).
+"""
+
+import multiprocessing
+import os
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pdfplumber
+from pdfplumber.utils.text import LIGATURES
+
+# ---------- EXTRACTION ----------
+def words_from_chars(chars, x_tolerance=3, y_tolerance=3):
+    """
+    Merge ``page.chars`` into word tokens as (x0, top, x1, bottom, text) arrays.
+
+    A NumPy port of ``page.extract_words()`` with its default settings, giving the
+    same tokens in the same order. Consecutive runs of upright / rotated chars are
+    split into lines (clustered on ``top``, or ``x0`` when rotated) and each line is
+    read along x (or ``top`` when rotated). A char starts a new token after
+    whitespace, or when it moves backwards, jumps more than the tolerance past the
+    previous char, or drifts off its line, exactly as pdfplumber's
+    ``char_begins_new_word`` decides.
+    """
+    n = len(chars)
+    if not n:
+        return np.empty(0), np.empty(0), np.empty(0), np.empty(0), np.empty(0, dtype=object)
+    x0 = np.fromiter((c["x0"] for c in chars), dtype=float, count=n)
+    x1 = np.fromiter((c["x1"] for c in chars), dtype=float, count=n)
+    top = np.fromiter((c["top"] for c in chars), dtype=float, count=n)
+    bottom = np.fromiter((c["bottom"] for c in chars), dtype=float, count=n)
+    upright = np.fromiter((bool(c["upright"]) for c in chars), dtype=bool, count=n)
+    raw = [c["text"] or "" for c in chars]
+    text = np.array([LIGATURES.get(t, t) for t in raw], dtype=object)
+    blank = np.fromiter((t.isspace() for t in raw), dtype=bool, count=n)
+    # pdfplumber's punctuation check ("" in "") makes an empty-text char a token of its own
+    solo = np.fromiter((t == "" for t in raw), dtype=bool, count=n)
+
+    # Per-char geometry in reading terms: rotated text swaps the roles of x and y
+    line_pos = np.where(upright, top, x0)
+    line_tol = np.where(upright, y_tolerance, x_tolerance)
+    read_start = np.where(upright, x0, top)
+    read_end = np.where(upright, x1, bottom)
+    read_key2 = np.where(upright, x0, bottom)
+    read_tol = np.where(upright, x_tolerance, y_tolerance)
+
+    # Cluster lines within each run of equal orientation (content-stream order)
+    run = np.cumsum(np.r_[False, upright[1:] != upright[:-1]])
+    by_line = np.lexsort((line_pos, run))
+    pos = line_pos[by_line]
+    new_line = np.r_[True, (run[by_line][1:] != run[by_line][:-1]) | (pos[1:] > pos[:-1] + line_tol[by_line][1:])]
+    line = np.empty(n, dtype=np.int64)
+    line[by_line] = np.cumsum(new_line)
+
+    # Read each line in order; ties keep content-stream order like pdfplumber's stable sorts
+    order = np.lexsort((np.arange(n), read_key2, read_start, line))
+    line, blank, solo = line[order], blank[order], solo[order]
+    a, b, c = read_start[order], read_end[order], read_start[order]
+    ay = line_pos[order]
+    xt, yt = read_tol[order], line_tol[order]
+
+    brk = np.ones(n, dtype=bool)
+    brk[1:] = (
+        (line[1:] != line[:-1])
+        | blank[1:] | blank[:-1] | solo[1:] | solo[:-1]
+        | (c[1:] < a[:-1])
+        | (c[1:] > b[:-1] + xt[:-1])
+        | (np.abs(ay[1:] - ay[:-1]) > yt[:-1])
+    )
+    keep = ~blank
+    if not keep.any():
+        return words_from_chars([])
+    tok = np.cumsum(brk)[keep]
+    order = order[keep]
+    x0, x1, top, bottom, text = x0[order], x1[order], top[order], bottom[order], text[order]
+
+    starts = np.r_[0, np.flatnonzero(np.diff(tok)) + 1]
+    texts = np.array(["".join(t) for t in np.split(text, starts[1:])], dtype=object)
+    return (
+        np.minimum.reduceat(x0, starts),
+        np.minimum.reduceat(top, starts),
+        np.maximum.reduceat(x1, starts),
+        np.maximum.reduceat(bottom, starts),
+        texts,
+    )
+
+def row_clusters(y, tolerance=2):
+    """
+    Group visually-close y positions (in reading order) into integer row ids, numbered top to bottom.
+
+    Same rule as the original per-word scan: a y joins the earliest-created row whose
+    anchor y is within ``tolerance``, otherwise it anchors a new row. Anchors are kept
+    sorted and are always more than ``tolerance`` apart, so each lookup is a bisect
+    plus at most a couple of candidate checks instead of a scan over every row.
+    """
+    anchors, created = [], []  # sorted anchor ys, and each anchor's creation index
+    row_of = np.empty(len(y), dtype=np.int64)
+    eps = 1e-9  # widen the bisect window; the abs() test below decides exactly
+    for i, v in enumerate(np.asarray(y, dtype=float).tolist()):
+        lo = bisect_left(anchors, v - tolerance - eps)
+        hi = bisect_right(anchors, v + tolerance + eps)
+        matches = [created[j] for j in range(lo, hi) if abs(v - anchors[j]) <= tolerance]
+        if matches:
+            row_of[i] = min(matches)
+        else:
+            at = bisect_left(anchors, v, lo, hi)
+            row_of[i] = len(anchors)
+            anchors.insert(at, v)
+            created.insert(at, len(anchors) - 1)
+    # Renumber rows by anchor y so ids run top to bottom
+    rank = np.empty(len(anchors), dtype=np.int64)
+    rank[created] = np.arange(len(anchors))
+    return rank[row_of]
+
+@lru_cache(maxsize=32)
+def _bounds_arrays(cols):
+    names, xmins, xmaxs = zip(*cols)
+    xmins, xmaxs = np.array(xmins, dtype=float), np.array(xmaxs, dtype=float)
+    order = np.argsort(xmins, kind="stable")
+    lo, hi = xmins[order], xmaxs[order]
+    disjoint = bool(np.all(lo[1:] > hi[:-1]))
+    return np.array(names, dtype=object), (xmins, xmaxs, order, lo, hi, disjoint)
+
+def column_bounds(columns):
+    """
+    (names, bounds) for ``locate_columns``: names in the user's column order, and the
+    x-ranges with their sort order and disjointness. Built once per distinct column
+    layout, so every page of a run reuses them without sorting again.
+    """
+    return _bounds_arrays(tuple((name, lo, hi) for name, (lo, hi) in columns.items()))
+
+def locate_columns(x, bounds):
+    """
+    Index of the first column (in the given order) whose [xmin, xmax] contains each x; -1 if none.
+
+    Disjoint layouts binary-search the sorted xmins (O(log C) per word). When ranges
+    overlap or share an edge, words fall back to a first-match test so nested columns
+    and shared edges keep the owner the original dict scan gave them.
+    """
+    xmins, xmaxs, order, lo, hi, disjoint = bounds
+    if disjoint:
+        i = np.clip(np.searchsorted(lo, x, side="right") - 1, 0, None)
+        hit = (x >= lo[i]) & (x <= hi[i])
+        return np.where(hit, order[i], -1)
+    inside = (x[:, None] >= xmins) & (x[:, None] <= xmaxs)
+    return np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+
+def extract_positional_table(words, columns, y_tolerance=2, header_cutoff=200, footer_cutoff=570):
+    """Extract rows from a single page's words (``words_from_chars`` arrays) using defined x-ranges for columns."""
+    x, y, _, _, texts = words
+    if not len(x) or not columns:
+        return pd.DataFrame()
+
+    # Drop words in the header/footer bands
+    m = (y >= header_cutoff) & (y <= footer_cutoff)
+    x, y, texts = x[m], y[m], texts[m]
+
+    # Bucket x into columns (first matching column wins, as in the column dict order)
+    names, bounds = column_bounds(columns)
+    idx = locate_columns(x, bounds)
+    hit = idx >= 0
+    if not hit.any():
+        return pd.DataFrame()
+
+    row_id = row_clusters(y[hit], tolerance=y_tolerance)
+    # Fill plain dicts (a pandas groupby/unstack costs several times the whole bucketing)
+    rows = [{} for _ in range(int(row_id.max()) + 1)]
+    for r, col, text in zip(row_id.tolist(), names[idx[hit]].tolist(), texts[hit].tolist()):
+        row = rows[r]
+        row[col] = row[col] + " " + text if col in row else text
+    table = pd.DataFrame(rows)
+
+    # Keep the user's column order rather than first appearance
+    return table.reindex(columns=[c for c in columns if c in table.columns])
+
+# ---------- WORKER PROCESSES ----------
+# Below this many pages, starting workers (each re-opens the PDF) costs more than it saves
+MIN_POOL_PAGES = 4
+
+_worker_pdf = None
+
+def _init_worker(pdf_bytes):
+    """Open the PDF once per worker process rather than once per page."""
+    global _worker_pdf
+    _worker_pdf = pdfplumber.open(BytesIO(pdf_bytes))
+
+def _words_from(pdf, page_index):
+    page = pdf.pages[page_index]
+    words = words_from_chars(page.chars)
+    # Drop the parsed layout so at most one page's objects are held at a time
+    page.flush_cache()
+    return words
+
+def page_words(page_index):
+    """Worker task: parse the words of one page of the PDF opened by ``_init_worker``."""
+    return _words_from(_worker_pdf, page_index)
+
+def parse_pages(pdf_bytes, page_indices, max_workers=None):
+    """
+    Yield (page_index, words) in the order of ``page_indices``, words as from ``words_from_chars``.
+    Runs in-process for fewer than ``MIN_POOL_PAGES`` pages, otherwise in parallel worker processes.
+    Parsing doesn't depend on the column settings, so callers can keep the words and re-run only
+    ``extract_positional_table`` when columns or cutoffs change.
+    """
+    page_indices = list(page_indices)
+    if len(page_indices) < MIN_POOL_PAGES:
+        with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+            for page_index in page_indices:
+                yield page_index, _words_from(pdf, page_index)
+        return
+
+    ex = ProcessPoolExecutor(
+        max_workers=min(len(page_indices), max_workers or os.cpu_count() or 1),
+        # spawn, not fork: forking Streamlit's multithreaded server can deadlock the child
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(pdf_bytes,),
+    )
+    try:
+        yield from zip(page_indices, ex.map(page_words, page_indices))
+    finally:
+        # A Streamlit rerun abandons the generator mid-way; don't finish the remaining pages
+        ex.shutdown(cancel_futures=True)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Tests for the Streamlit-free extraction helpers in Borelog_GUI/table_extraction.py."""
+
+import os
+import sys
+import threading
+import types
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pdfplumber = pytest.importorskip("pdfplumber")
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, "Borelog_GUI"))
+
+from table_extraction import (  # noqa: E402
+    MIN_POOL_PAGES, column_bounds, extract_positional_table, locate_columns, parse_pages, row_clusters,
+    words_from_chars,
+)
+
+
+def _assign_row_ids(ys, tolerance):
+    """Reference: the original per-word assign_row scan, numbered top to bottom."""
+    anchors = []
+    rows = []
+    for y in ys:
+        row = next((ry for ry in anchors if abs(y - ry) <= tolerance), None)
+        if row is None:
+            anchors.append(y)
+            row = y
+        rows.append(row)
+    order = {ry: i for i, ry in enumerate(sorted(anchors))}
+    return [order[r] for r in rows]
+
+
+@pytest.mark.parametrize("ys", [
+    [329.98, 326.38, 330.5, 326.4],        # 3.6pt apart with tolerance 2: two rows
+    [10.0, 11.9, 13.8, 15.7],              # drifting: chains must not merge
+    [100.0, 99.95, 100.05, 102.0, 98.0],   # close values either side of an anchor
+    [],
+])
+def test_row_clusters_matches_assign_row(ys):
+    assert row_clusters(ys, tolerance=2).tolist() == _assign_row_ids(ys, 2)
+
+
+def test_row_clusters_random_pages():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        ys = np.round(rng.uniform(150, 600, size=200), 2).tolist()
+        assert row_clusters(ys, tolerance=2).tolist() == _assign_row_ids(ys, 2)
+
+
+def _locate(columns, xs):
+    names, bounds = column_bounds(columns)
+    idx = locate_columns(np.array(xs, dtype=float), bounds)
+    return [names[i] if i >= 0 else None for i in idx]
+
+
+def test_locate_columns_disjoint_binary_search():
+    columns = {"Z": (300, 310), "A": (10, 20)}
+    assert _locate(columns, [305, 15, 25, 5, 310]) == ["Z", "A", None, None, "Z"]
+
+
+def test_locate_columns_nested_and_shared_edges_keep_first_match():
+    assert _locate({"A": (100, 200), "B": (150, 160)}, [170, 155, 90]) == ["A", "A", None]
+    shared = {"PocketPen_kPa": (390, 410), "Torvane_kPa": (410, 440)}
+    assert _locate(shared, [410, 420]) == ["PocketPen_kPa", "Torvane_kPa"]
+
+
+def test_words_from_chars_matches_extract_words():
+    with pdfplumber.open(os.path.join(REPO, "Borelog_GUI", "spt_a1.pdf")) as pdf:
+        for page in pdf.pages:
+            expected = page.extract_words()
+            x0, top, x1, bottom, text = words_from_chars(page.chars)
+            assert text.tolist() == [w["text"] for w in expected]
+            assert x0.tolist() == [w["x0"] for w in expected]
+            assert top.tolist() == [w["top"] for w in expected]
+            assert x1.tolist() == [w["x1"] for w in expected]
+            assert bottom.tolist() == [w["bottom"] for w in expected]
+
+
+# The app's default column layout
+COLUMNS = {
+    "SoilType": (45, 50), "SampleID": (85, 95), "BlowCounts": (150, 190), "CasingDepth_m": (195, 221),
+    "RodLength_m": (223, 245), "EnergyRatio_%": (250, 272), "PocketPen_kPa": (390, 410),
+    "Torvane_kPa": (410, 440), "Moisture_%": (440, 460),
+}
+
+
+def _baseline_table(words, columns, y_tolerance=2, header_cutoff=200, footer_cutoff=570):
+    """Reference: the original dict-of-rows extractor over ``extract_words()`` dicts."""
+    rows = defaultdict(lambda: defaultdict(str))
+    for w in words:
+        x, y, text = w["x0"], w["top"], w["text"]
+        if y < header_cutoff or y > footer_cutoff:
+            continue
+        for col, (xmin, xmax) in columns.items():
+            if xmin <= x <= xmax:
+                row_y = next((ry for ry in rows.keys() if abs(y - ry) <= y_tolerance), y)
+                rows[row_y][col] += (" " + text)
+                break
+    return pd.DataFrame([rows[y] for y in sorted(rows.keys())])
+
+
+def test_extract_positional_table_matches_baseline():
+    """Same rows and cells as the original; cells are now stripped and columns follow the user's order."""
+    with pdfplumber.open(os.path.join(REPO, "Borelog_GUI", "spt_a1.pdf")) as pdf:
+        for page in pdf.pages:
+            got = extract_positional_table(words_from_chars(page.chars), COLUMNS, header_cutoff=160)
+            expected = _baseline_table(page.extract_words(), COLUMNS, header_cutoff=160)
+            assert not got.empty
+            expected = expected.apply(lambda c: c.str.strip())
+            expected = expected.reindex(columns=[c for c in COLUMNS if c in expected.columns])
+            pd.testing.assert_frame_equal(got, expected)
+
+
+def test_parse_pages_pool_under_streamlit_main(monkeypatch):
+    """Spawned workers re-run the GUI script Streamlit installs as ``__main__``; its UI must stay idle there."""
+    pytest.importorskip("streamlit")
+    pytest.importorskip("xlsxwriter")
+    fake_main = types.ModuleType("__main__")
+    fake_main.__file__ = os.path.join(REPO, "Borelog_GUI", "pdf_table_extractor_gui_04.py")
+    fake_main.__spec__ = None
+    monkeypatch.setitem(sys.modules, "__main__", fake_main)
+
+    path = os.path.join(REPO, "Borelog_GUI", "spt_a1.pdf")
+    with open(path, "rb") as f:
+        pdf_bytes = f.read()
+    pages = [0] * MIN_POOL_PAGES
+    result = []
+    # A broken pool can hang instead of raising, so run it where a timeout can catch that
+    t = threading.Thread(target=lambda: result.extend(parse_pages(pdf_bytes, pages, max_workers=2)), daemon=True)
+    t.start()
+    t.join(timeout=120)
+    assert not t.is_alive(), "parse_pages hung starting worker processes"
+
+    with pdfplumber.open(path) as pdf:
+        expected = words_from_chars(pdf.pages[0].chars)
+    assert [i for i, _ in result] == pages
+    for _, words in result:
+        assert all(np.array_equal(a, b) for a, b in zip(words, expected))